@@ -404,18 +404,20 @@ class SchemaTestCaseMixin(unittest.TestCase):
 
 
 def populate_dir(path, files):
-    if not os.path.exists(path):
-        os.makedirs(path)
+    # Files regularly share a dirname; create each target directory once
+    # up-front rather than re-checking it for every file.
+    dirs = {os.path.dirname(os.path.sep.join([path, name])) for name in files}
+    dirs.add(path)
+    for d in dirs:
+        os.makedirs(d, exist_ok=True)
     ret = []
     for (name, content) in files.items():
         p = os.path.sep.join([path, name])
-        util.ensure_dir(os.path.dirname(p))
         with open(p, "wb") as fp:
             if isinstance(content, bytes):
                 fp.write(content)
             else:
                 fp.write(content.encode("utf-8"))
-            fp.close()
         ret.append(p)
 
     return ret
@@ -1,14 +1,18 @@
 # This file is part of cloud-init. See LICENSE file for license information.
 
+import functools
 import json
 import os
-from copy import copy, deepcopy
+import shutil
+import tempfile
+from copy import deepcopy
+from types import MappingProxyType
 
 from cloudinit import helpers, settings, util
 from cloudinit.net import eni, network_state
 from cloudinit.sources import DataSourceConfigDrive as ds
 from cloudinit.sources.helpers import openstack
-from tests.unittests.helpers import CiTestCase, ExitStack, mock, populate_dir
+from tests.unittests.helpers import CiTestCase, mock, populate_dir
 
 PUBKEY = "ssh-rsa AAAAB3NzaC1....sIkJhq8wdX+4I3A4cYbYP ubuntu@server-460\n"
 EC2_META = {
@@ -358,125 +362,212 @@ KNOWN_MACS = {
     "0c:c4:7a:34:6e:3c": "oeth0",
 }
 
+
+@functools.lru_cache(maxsize=None)
+def _converted_network_data():
+    """Convert NETWORK_DATA with KNOWN_MACS, memoizing the result.
+
+    With known_macs supplied the conversion is deterministic, so tests
+    that only compare against the converted form can share one call.
+    Deferred to call time (not import time) so it runs under the test
+    classes' is_openvswitch_internal_interface mock.
+    """
+    return openstack.convert_net_json(NETWORK_DATA, known_macs=KNOWN_MACS)
+
+
+try:
+    # orjson serializes straight to bytes and is markedly faster than the
+    # stdlib, but it is not a cloud-init dependency; use it only when the
+    # test environment happens to provide it.
+    from orjson import dumps as _json_dumps
+except ImportError:
+
+    def _json_dumps(obj):
+        return json.dumps(obj).encode("utf-8")
+
+
+# Each payload above is static, so serialize it exactly once instead of
+# every time it is referenced in CFG_DRIVE_FILES_V2. Bytes let populate_dir
+# write the content as-is.
+EC2_META_JSON = _json_dumps(EC2_META)
+OSTACK_META_JSON = _json_dumps(OSTACK_META)
+VENDOR_DATA_JSON = _json_dumps(VENDOR_DATA)
+VENDOR_DATA2_JSON = _json_dumps(VENDOR_DATA2)
+NETWORK_DATA_JSON = _json_dumps(NETWORK_DATA)
+
+# The payloads are shared across every test in this module; make them
+# read-only so a stray in-test mutation cannot leak into later tests.
+# NETWORK_DATA stays a plain dict as some tests deepcopy it.
+EC2_META = MappingProxyType(EC2_META)
+OSTACK_META = MappingProxyType(OSTACK_META)
+VENDOR_DATA = MappingProxyType(VENDOR_DATA)
+VENDOR_DATA2 = MappingProxyType(VENDOR_DATA2)
+
+# What read_config_drive() is expected to report as metadata for the
+# CFG_DRIVE_FILES_V2 tree: OSTACK_META plus the derived id/hostname keys.
+EXPECTED_MD = MappingProxyType(
+    dict(
+        OSTACK_META,
+        **{
+            "instance-id": OSTACK_META["uuid"],
+            "local-hostname": OSTACK_META["hostname"],
+        }
+    )
+)
+
 CFG_DRIVE_FILES_V2 = {
-    "ec2/2009-04-04/meta-data.json": json.dumps(EC2_META),
+    "ec2/2009-04-04/meta-data.json": EC2_META_JSON,
     "ec2/2009-04-04/user-data": USER_DATA,
-    "ec2/latest/meta-data.json": json.dumps(EC2_META),
+    "ec2/latest/meta-data.json": EC2_META_JSON,
     "ec2/latest/user-data": USER_DATA,
-    "openstack/2012-08-10/meta_data.json": json.dumps(OSTACK_META),
+    "openstack/2012-08-10/meta_data.json": OSTACK_META_JSON,
     "openstack/2012-08-10/user_data": USER_DATA,
     "openstack/content/0000": CONTENT_0,
     "openstack/content/0001": CONTENT_1,
-    "openstack/latest/meta_data.json": json.dumps(OSTACK_META),
+    "openstack/latest/meta_data.json": OSTACK_META_JSON,
     "openstack/latest/user_data": USER_DATA,
-    "openstack/latest/vendor_data.json": json.dumps(VENDOR_DATA),
-    "openstack/latest/vendor_data2.json": json.dumps(VENDOR_DATA2),
-    "openstack/latest/network_data.json": json.dumps(NETWORK_DATA),
-    "openstack/2015-10-15/meta_data.json": json.dumps(OSTACK_META),
+    "openstack/latest/vendor_data.json": VENDOR_DATA_JSON,
+    "openstack/latest/vendor_data2.json": VENDOR_DATA2_JSON,
+    "openstack/latest/network_data.json": NETWORK_DATA_JSON,
+    "openstack/2015-10-15/meta_data.json": OSTACK_META_JSON,
     "openstack/2015-10-15/user_data": USER_DATA,
-    "openstack/2015-10-15/network_data.json": json.dumps(NETWORK_DATA),
-    "openstack/2015-10-15/vendor_data.json": json.dumps(VENDOR_DATA),
-    "openstack/2015-10-15/vendor_data2.json": json.dumps(VENDOR_DATA2),
+    "openstack/2015-10-15/network_data.json": NETWORK_DATA_JSON,
+    "openstack/2015-10-15/vendor_data.json": VENDOR_DATA_JSON,
+    "openstack/2015-10-15/vendor_data2.json": VENDOR_DATA2_JSON,
 }
 
 M_PATH = "cloudinit.sources.DataSourceConfigDrive."
 
+# The fixture trees written by these tests are throwaway; root them in a
+# tmpfs when one is available so mkdtemp/populate/rmtree cycles stay
+# memory-bound instead of hitting the disk. /dev/shm must not be used:
+# the datasource reports any /dev-prefixed source as a config disk.
+TMPFS_DIR = "/run/shm" if os.path.isdir("/run/shm") else None
+
 
 class TestConfigDriveDataSource(CiTestCase):
+    @classmethod
+    def setUpClass(cls):
+        # Most tests need self.tmp populated with CFG_DRIVE_FILES_V2;
+        # serialize and write that tree once per class and clone it per
+        # test instead of re-writing ~18 files each time.
+        cls._v2_template = tempfile.mkdtemp(
+            prefix="ci-%s." % cls.__name__, dir=TMPFS_DIR
+        )
+        populate_dir(cls._v2_template, CFG_DRIVE_FILES_V2)
+        # Tests that only need the parsed result (rather than a seed
+        # directory of their own) share this one read of the template.
+        cls._found_v2 = ds.read_config_drive(cls._v2_template)
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(cls._v2_template, ignore_errors=True)
+
     def setUp(self):
         super(TestConfigDriveDataSource, self).setUp()
         self.add_patch(
             M_PATH + "util.find_devs_with", "m_find_devs_with", return_value=[]
         )
-        self.tmp = self.tmp_dir()
+        self.tmp = self.tmp_dir(dir=TMPFS_DIR)
+
+    def populate_v2_dir(self, target):
+        """Clone the class-level CFG_DRIVE_FILES_V2 template into target.
+
+        The clones are only ever read, so hardlink the template's files
+        instead of copying their contents; target and template live on
+        the same filesystem (both rooted in TMPFS_DIR). Fall back to a
+        real copy if the link fails (e.g. crossing filesystems).
+        """
+        for src_root, _dirs, files in os.walk(self._v2_template):
+            dst_root = os.path.join(
+                target, os.path.relpath(src_root, self._v2_template)
+            )
+            os.makedirs(dst_root, exist_ok=True)
+            for fname in files:
+                src = os.path.join(src_root, fname)
+                dst = os.path.join(dst_root, fname)
+                try:
+                    os.link(src, dst)
+                except OSError:
+                    shutil.copy(src, dst)
 
     def test_ec2_metadata(self):
-        populate_dir(self.tmp, CFG_DRIVE_FILES_V2)
-        found = ds.read_config_drive(self.tmp)
+        found = self._found_v2
         self.assertTrue("ec2-metadata" in found)
         ec2_md = found["ec2-metadata"]
         self.assertEqual(EC2_META, ec2_md)
 
     def test_dev_os_remap(self):
-        populate_dir(self.tmp, CFG_DRIVE_FILES_V2)
         cfg_ds = ds.DataSourceConfigDrive(
             settings.CFG_BUILTIN, None, helpers.Paths({})
         )
-        found = ds.read_config_drive(self.tmp)
-        cfg_ds.metadata = found["metadata"]
+        cfg_ds.metadata = self._found_v2["metadata"]
         name_tests = {
             "ami": "/dev/vda1",
             "root": "/dev/vda1",
             "ephemeral0": "/dev/vda2",
             "swap": "/dev/vda3",
         }
-        for name, dev_name in name_tests.items():
-            with ExitStack() as mocks:
-                provided_name = dev_name[len("/dev/") :]
-                provided_name = "s" + provided_name[1:]
-                find_mock = mocks.enter_context(
-                    mock.patch.object(
-                        util, "find_devs_with", return_value=[provided_name]
-                    )
-                )
-                # We want os.path.exists() to return False on its first call,
-                # and True on its second call.  We use a handy generator as
-                # the mock side effect for this.  The mocked function returns
-                # what the side effect returns.
-
-                def exists_side_effect():
-                    yield False
-                    yield True
-
-                exists_mock = mocks.enter_context(
-                    mock.patch.object(
-                        os.path, "exists", side_effect=exists_side_effect()
+
+        # Patch once for the whole test; only the mocks' return values
+        # change between iterations.  os.path.exists cannot be patched
+        # earlier as read_config_drive() relies on the real thing.
+        with mock.patch.object(
+            util, "find_devs_with"
+        ) as find_mock, mock.patch.object(os.path, "exists") as exists_mock:
+            for name, dev_name in name_tests.items():
+                with self.subTest(name=name):
+                    provided_name = dev_name[len("/dev/") :]
+                    provided_name = "s" + provided_name[1:]
+                    find_mock.reset_mock()
+                    find_mock.return_value = [provided_name]
+                    exists_mock.reset_mock()
+                    # os.path.exists() returns False on its first call
+                    # and True on its second.
+                    exists_mock.side_effect = [False, True]
+
+                    self.assertEqual(
+                        dev_name, cfg_ds.device_name_to_device(name)
                     )
-                )
-                self.assertEqual(dev_name, cfg_ds.device_name_to_device(name))
 
-                find_mock.assert_called_once_with(mock.ANY)
-                self.assertEqual(exists_mock.call_count, 2)
+                    find_mock.assert_called_once_with(mock.ANY)
+                    self.assertEqual(exists_mock.call_count, 2)
 
     def test_dev_os_map(self):
-        populate_dir(self.tmp, CFG_DRIVE_FILES_V2)
         cfg_ds = ds.DataSourceConfigDrive(
             settings.CFG_BUILTIN, None, helpers.Paths({})
         )
-        found = ds.read_config_drive(self.tmp)
-        os_md = found["metadata"]
-        cfg_ds.metadata = os_md
+        cfg_ds.metadata = self._found_v2["metadata"]
         name_tests = {
             "ami": "/dev/vda1",
             "root": "/dev/vda1",
             "ephemeral0": "/dev/vda2",
             "swap": "/dev/vda3",
         }
-        for name, dev_name in name_tests.items():
-            with ExitStack() as mocks:
-                find_mock = mocks.enter_context(
-                    mock.patch.object(
-                        util, "find_devs_with", return_value=[dev_name]
+        with mock.patch.object(
+            util, "find_devs_with"
+        ) as find_mock, mock.patch.object(
+            os.path, "exists", return_value=True
+        ) as exists_mock:
+            for name, dev_name in name_tests.items():
+                with self.subTest(name=name):
+                    find_mock.reset_mock()
+                    find_mock.return_value = [dev_name]
+                    exists_mock.reset_mock()
+
+                    self.assertEqual(
+                        dev_name, cfg_ds.device_name_to_device(name)
                     )
-                )
-                exists_mock = mocks.enter_context(
-                    mock.patch.object(os.path, "exists", return_value=True)
-                )
-                self.assertEqual(dev_name, cfg_ds.device_name_to_device(name))
 
-                find_mock.assert_called_once_with(mock.ANY)
-                exists_mock.assert_called_once_with(mock.ANY)
+                    find_mock.assert_called_once_with(mock.ANY)
+                    exists_mock.assert_called_once_with(mock.ANY)
 
     def test_dev_ec2_remap(self):
-        populate_dir(self.tmp, CFG_DRIVE_FILES_V2)
         cfg_ds = ds.DataSourceConfigDrive(
             settings.CFG_BUILTIN, None, helpers.Paths({})
         )
-        found = ds.read_config_drive(self.tmp)
-        ec2_md = found["ec2-metadata"]
-        os_md = found["metadata"]
-        cfg_ds.ec2_metadata = ec2_md
-        cfg_ds.metadata = os_md
+        cfg_ds.ec2_metadata = self._found_v2["ec2-metadata"]
+        cfg_ds.metadata = self._found_v2["metadata"]
         name_tests = {
             "ami": "/dev/vda1",
             "root": "/dev/vda1",
@@ -486,34 +577,28 @@ class TestConfigDriveDataSource(CiTestCase):
             "bob": None,
             "root2k": None,
         }
-        for name, dev_name in name_tests.items():
-            # We want os.path.exists() to return False on its first call,
-            # and True on its second call.  We use a handy generator as
-            # the mock side effect for this.  The mocked function returns
-            # what the side effect returns.
-            def exists_side_effect():
-                yield False
-                yield True
-
-            with mock.patch.object(
-                os.path, "exists", side_effect=exists_side_effect()
-            ):
-                self.assertEqual(dev_name, cfg_ds.device_name_to_device(name))
-                # We don't assert the call count for os.path.exists() because
-                # not all of the entries in name_tests results in two calls to
-                # that function.  Specifically, 'root2k' doesn't seem to call
-                # it at all.
+
+        with mock.patch.object(os.path, "exists") as exists_mock:
+            for name, dev_name in name_tests.items():
+                with self.subTest(name=name):
+                    # os.path.exists() returns False on its first call
+                    # and True on its second.
+                    exists_mock.side_effect = [False, True]
+
+                    self.assertEqual(
+                        dev_name, cfg_ds.device_name_to_device(name)
+                    )
+                    # We don't assert the call count for os.path.exists()
+                    # because not all of the entries in name_tests results
+                    # in two calls to that function.  Specifically,
+                    # 'root2k' doesn't seem to call it at all.
 
     def test_dev_ec2_map(self):
-        populate_dir(self.tmp, CFG_DRIVE_FILES_V2)
         cfg_ds = ds.DataSourceConfigDrive(
             settings.CFG_BUILTIN, None, helpers.Paths({})
         )
-        found = ds.read_config_drive(self.tmp)
-        ec2_md = found["ec2-metadata"]
-        os_md = found["metadata"]
-        cfg_ds.ec2_metadata = ec2_md
-        cfg_ds.metadata = os_md
+        cfg_ds.ec2_metadata = self._found_v2["ec2-metadata"]
+        cfg_ds.metadata = self._found_v2["metadata"]
         name_tests = {
             "ami": "/dev/sda1",
             "root": "/dev/sda1",
@@ -523,23 +608,22 @@ class TestConfigDriveDataSource(CiTestCase):
             "bob": None,
             "root2k": None,
         }
-        for name, dev_name in name_tests.items():
-            with mock.patch.object(os.path, "exists", return_value=True):
-                self.assertEqual(dev_name, cfg_ds.device_name_to_device(name))
+        with mock.patch.object(os.path, "exists", return_value=True):
+            for name, dev_name in name_tests.items():
+                with self.subTest(name=name):
+                    self.assertEqual(
+                        dev_name, cfg_ds.device_name_to_device(name)
+                    )
 
     def test_dir_valid(self):
         """Verify a dir is read as such."""
 
-        populate_dir(self.tmp, CFG_DRIVE_FILES_V2)
+        self.populate_v2_dir(self.tmp)
 
         found = ds.read_config_drive(self.tmp)
 
-        expected_md = copy(OSTACK_META)
-        expected_md["instance-id"] = expected_md["uuid"]
-        expected_md["local-hostname"] = expected_md["hostname"]
-
         self.assertEqual(USER_DATA, found["userdata"])
-        self.assertEqual(expected_md, found["metadata"])
+        self.assertEqual(EXPECTED_MD, found["metadata"])
         self.assertEqual(NETWORK_DATA, found["networkdata"])
         self.assertEqual(VENDOR_DATA, found["vendordata"])
         self.assertEqual(VENDOR_DATA2, found["vendordata2"])
@@ -549,27 +633,26 @@ class TestConfigDriveDataSource(CiTestCase):
     def test_seed_dir_valid_extra(self):
         """Verify extra files do not affect datasource validity."""
 
-        data = copy(CFG_DRIVE_FILES_V2)
-        data["myfoofile.txt"] = "myfoocontent"
-        data["openstack/latest/random-file.txt"] = "random-content"
+        data = {
+            **CFG_DRIVE_FILES_V2,
+            "myfoofile.txt": b"myfoocontent",
+            "openstack/latest/random-file.txt": b"random-content",
+        }
 
         populate_dir(self.tmp, data)
 
         found = ds.read_config_drive(self.tmp)
 
-        expected_md = copy(OSTACK_META)
-        expected_md["instance-id"] = expected_md["uuid"]
-        expected_md["local-hostname"] = expected_md["hostname"]
-
-        self.assertEqual(expected_md, found["metadata"])
+        self.assertEqual(EXPECTED_MD, found["metadata"])
 
     def test_seed_dir_bad_json_metadata(self):
         """Verify that bad json in metadata raises BrokenConfigDriveDir."""
-        data = copy(CFG_DRIVE_FILES_V2)
-
-        data["openstack/2012-08-10/meta_data.json"] = "non-json garbage {}"
-        data["openstack/2015-10-15/meta_data.json"] = "non-json garbage {}"
-        data["openstack/latest/meta_data.json"] = "non-json garbage {}"
+        data = {
+            **CFG_DRIVE_FILES_V2,
+            "openstack/2012-08-10/meta_data.json": b"non-json garbage {}",
+            "openstack/2015-10-15/meta_data.json": b"non-json garbage {}",
+            "openstack/latest/meta_data.json": b"non-json garbage {}",
+        }
 
         populate_dir(self.tmp, data)
 
@@ -577,23 +660,9 @@ class TestConfigDriveDataSource(CiTestCase):
             openstack.BrokenMetadata, ds.read_config_drive, self.tmp
         )
 
-    def test_seed_dir_no_configdrive(self):
-        """Verify that no metadata raises NonConfigDriveDir."""
-
-        my_d = os.path.join(self.tmp, "non-configdrive")
-        data = copy(CFG_DRIVE_FILES_V2)
-        data["myfoofile.txt"] = "myfoocontent"
-        data["openstack/latest/random-file.txt"] = "random-content"
-        data["content/foo"] = "foocontent"
-
-        self.assertRaises(openstack.NonReadable, ds.read_config_drive, my_d)
-
-    def test_seed_dir_missing(self):
-        """Verify that missing seed_dir raises NonConfigDriveDir."""
-        my_d = os.path.join(self.tmp, "nonexistantdirectory")
-        self.assertRaises(openstack.NonReadable, ds.read_config_drive, my_d)
-
-    def test_find_candidates(self):
+    @mock.patch.object(util, "is_partition")
+    @mock.patch.object(util, "find_devs_with")
+    def test_find_candidates(self, m_find_devs_with, m_is_partition):
         devs_with_answers = {}
 
         def my_devs_with(*args, **kwargs):
@@ -603,45 +672,36 @@ class TestConfigDriveDataSource(CiTestCase):
         def my_is_partition(dev):
             return dev[-1] in "0123456789" and not dev.startswith("sr")
 
-        orig_find_devs_with = util.find_devs_with
-        orig_is_partition = util.is_partition
-        try:
-            util.find_devs_with = my_devs_with
-            util.is_partition = my_is_partition
-
-            devs_with_answers = {
-                "TYPE=vfat": [],
-                "TYPE=iso9660": ["/dev/vdb"],
-                "LABEL=config-2": ["/dev/vdb"],
-            }
-            self.assertEqual(["/dev/vdb"], ds.find_candidate_devs())
-
-            # add a vfat item
-            # zdd reverse sorts after vdb, but config-2 label is preferred
-            devs_with_answers["TYPE=vfat"] = ["/dev/zdd"]
-            self.assertEqual(
-                ["/dev/vdb", "/dev/zdd"], ds.find_candidate_devs()
-            )
+        m_find_devs_with.side_effect = my_devs_with
+        m_is_partition.side_effect = my_is_partition
+
+        devs_with_answers = {
+            "TYPE=vfat": [],
+            "TYPE=iso9660": ["/dev/vdb"],
+            "LABEL=config-2": ["/dev/vdb"],
+        }
+        self.assertEqual(["/dev/vdb"], ds.find_candidate_devs())
+
+        # add a vfat item
+        # zdd reverse sorts after vdb, but config-2 label is preferred
+        devs_with_answers["TYPE=vfat"] = ["/dev/zdd"]
+        self.assertEqual(["/dev/vdb", "/dev/zdd"], ds.find_candidate_devs())
+
+        # verify that partitions are considered, that have correct label.
+        devs_with_answers = {
+            "TYPE=vfat": ["/dev/sda1"],
+            "TYPE=iso9660": [],
+            "LABEL=config-2": ["/dev/vdb3"],
+        }
+        self.assertEqual(["/dev/vdb3"], ds.find_candidate_devs())
 
-            # verify that partitions are considered, that have correct label.
-            devs_with_answers = {
-                "TYPE=vfat": ["/dev/sda1"],
-                "TYPE=iso9660": [],
-                "LABEL=config-2": ["/dev/vdb3"],
-            }
-            self.assertEqual(["/dev/vdb3"], ds.find_candidate_devs())
-
-            # Verify that uppercase labels are also found.
-            devs_with_answers = {
-                "TYPE=vfat": [],
-                "TYPE=iso9660": ["/dev/vdb"],
-                "LABEL=CONFIG-2": ["/dev/vdb"],
-            }
-            self.assertEqual(["/dev/vdb"], ds.find_candidate_devs())
-
-        finally:
-            util.find_devs_with = orig_find_devs_with
-            util.is_partition = orig_is_partition
+        # Verify that uppercase labels are also found.
+        devs_with_answers = {
+            "TYPE=vfat": [],
+            "TYPE=iso9660": ["/dev/vdb"],
+            "LABEL=CONFIG-2": ["/dev/vdb"],
+        }
+        self.assertEqual(["/dev/vdb"], ds.find_candidate_devs())
 
     @mock.patch(M_PATH + "on_first_boot")
     def test_pubkeys_v2(self, on_first_boot):
@@ -667,6 +727,24 @@ class TestConfigDriveDataSource(CiTestCase):
         self.assertEqual("config-disk (/dev/anything)", cfg_ds.subplatform)
 
 
+class TestConfigDriveSeedDirMissing(CiTestCase):
+    """Negative read_config_drive cases.
+
+    These never read a seed tree, so they skip the template cloning and
+    patching TestConfigDriveDataSource sets up for every test.
+    """
+
+    def test_seed_dir_no_configdrive(self):
+        """Verify that no metadata raises NonConfigDriveDir."""
+        my_d = os.path.join(self.tmp_dir(), "non-configdrive")
+        self.assertRaises(openstack.NonReadable, ds.read_config_drive, my_d)
+
+    def test_seed_dir_missing(self):
+        """Verify that missing seed_dir raises NonConfigDriveDir."""
+        my_d = os.path.join(self.tmp_dir(), "nonexistantdirectory")
+        self.assertRaises(openstack.NonReadable, ds.read_config_drive, my_d)
+
+
 @mock.patch(
     "cloudinit.net.is_openvswitch_internal_interface",
     mock.Mock(return_value=False),
@@ -674,7 +752,7 @@ class TestConfigDriveDataSource(CiTestCase):
 class TestNetJson(CiTestCase):
     def setUp(self):
         super(TestNetJson, self).setUp()
-        self.tmp = self.tmp_dir()
+        self.tmp = self.tmp_dir(dir=TMPFS_DIR)
         self.maxDiff = None
 
     @mock.patch(M_PATH + "on_first_boot")
@@ -687,10 +765,7 @@ class TestNetJson(CiTestCase):
     def test_network_config_is_converted(self, on_first_boot):
         """Verify that network_data is converted and present on ds object."""
         myds = cfg_ds_from_dir(self.tmp, files=CFG_DRIVE_FILES_V2)
-        network_config = openstack.convert_net_json(
-            NETWORK_DATA, known_macs=KNOWN_MACS
-        )
-        self.assertEqual(myds.network_config, network_config)
+        self.assertEqual(myds.network_config, _converted_network_data())
 
     def test_network_config_conversion_dhcp6(self):
         """Test some ipv6 input network json and check the expected
@@ -855,7 +930,31 @@ class TestNetJson(CiTestCase):
             conv_data = openstack.convert_net_json(
                 in_data, known_macs=KNOWN_MACS
             )
-            self.assertEqual(out_data, conv_data)
+            # Compare structurally rather than as one position-sensitive
+            # list: physical entries keyed by mac address, nameservers
+            # order-insensitively.
+            self.assertEqual(out_data["version"], conv_data["version"])
+            self.assertEqual(
+                {
+                    e["mac_address"]: e
+                    for e in out_data["config"]
+                    if e["type"] == "physical"
+                },
+                {
+                    e["mac_address"]: e
+                    for e in conv_data["config"]
+                    if e["type"] == "physical"
+                },
+            )
+            self.assertCountEqual(
+                [e for e in out_data["config"] if e["type"] == "nameserver"],
+                [e for e in conv_data["config"] if e["type"] == "nameserver"],
+            )
+            # Catch any entry types the comparisons above would miss.
+            self.assertEqual(
+                sorted(e["type"] for e in out_data["config"]),
+                sorted(e["type"] for e in conv_data["config"]),
+            )
 
 
 @mock.patch(
@@ -868,7 +967,7 @@ class TestConvertNetworkData(CiTestCase):
 
     def setUp(self):
         super(TestConvertNetworkData, self).setUp()
-        self.tmp = self.tmp_dir()
+        self.tmp = self.tmp_dir(dir=TMPFS_DIR)
 
     def _getnames_in_config(self, ncfg):
         return set(
@@ -876,7 +975,7 @@ class TestConvertNetworkData(CiTestCase):
         )
 
     def test_conversion_fills_names(self):
-        ncfg = openstack.convert_net_json(NETWORK_DATA, known_macs=KNOWN_MACS)
+        ncfg = _converted_network_data()
         expected = set(["nic0", "enp0s1", "enp0s2"])
         found = self._getnames_in_config(ncfg)
         self.assertEqual(found, expected)
@@ -909,23 +1008,31 @@ class TestConvertNetworkData(CiTestCase):
         )
         # not the best test, but see that we get a route in the
         # network config and that it gets rendered to an ENI file
-        routes = []
-        for n in ncfg["config"]:
-            for s in n.get("subnets", []):
-                routes.extend(s.get("routes", []))
+        # dicts aren't hashable, so key the set on sorted item tuples;
+        # membership is then a hash lookup rather than a dict-by-dict scan.
+        routes = {
+            tuple(sorted(r.items()))
+            for n in ncfg["config"]
+            for s in n.get("subnets", [])
+            for r in s.get("routes", [])
+        }
         self.assertIn(
-            {"network": "0.0.0.0", "netmask": "0.0.0.0", "gateway": "2.2.2.9"},
+            tuple(
+                sorted(
+                    {
+                        "network": "0.0.0.0",
+                        "netmask": "0.0.0.0",
+                        "gateway": "2.2.2.9",
+                    }.items()
+                )
+            ),
             routes,
         )
-        eni_renderer = eni.Renderer()
-        eni_renderer.render_network_state(
-            network_state.parse_net_config_data(ncfg), target=self.tmp
+        # Render in memory; nothing here needs the file on disk.
+        eni_rendering = eni.network_state_to_eni(
+            network_state.parse_net_config_data(ncfg)
         )
-        with open(
-            os.path.join(self.tmp, "etc", "network", "interfaces"), "r"
-        ) as f:
-            eni_rendering = f.read()
-            self.assertIn("route add default gw 2.2.2.9", eni_rendering)
+        self.assertIn("route add default gw 2.2.2.9", eni_rendering)
 
     def test_conversion_with_tap(self):
         ncfg = openstack.convert_net_json(
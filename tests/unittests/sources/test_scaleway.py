@@ -1,15 +1,21 @@
 # This file is part of cloud-init. See LICENSE file for license information.
 
 import json
-import sys
+from types import SimpleNamespace
 from urllib.parse import SplitResult, urlsplit
 
+import pytest
 import requests
 import responses
 
 from cloudinit import helpers, settings, sources
 from cloudinit.sources import DataSourceScaleway
-from tests.unittests.helpers import CiTestCase, ResponsesTestCase, mock
+from tests.unittests.helpers import mock
+
+# Looked up once at import time: every test goes through these.
+DSScaleway = DataSourceScaleway.DataSourceScaleway
+USERDATA_URL = DataSourceScaleway.BUILTIN_DS_CONFIG["userdata_url"]
+VENDORDATA_URL = DataSourceScaleway.BUILTIN_DS_CONFIG["vendordata_url"]
 
 
 class DataResponses:
@@ -21,24 +27,84 @@ class DataResponses:
 
     FAKE_USER_DATA = '#!/bin/bash\necho "user-data"'
 
-    @staticmethod
-    def rate_limited(request):
-        return 429, request.headers, ""
-
-    @staticmethod
-    def api_error(request):
-        return 500, request.headers, ""
-
-    @classmethod
-    def get_ok(cls, request):
-        return 200, request.headers, cls.FAKE_USER_DATA
 
-    @staticmethod
-    def empty(request):
-        """
-        No user data for this server.
-        """
-        return 404, request.headers, ""
+# Module-level constants shared across tests; none of them is ever
+# mutated, the datasource parses its own copy out of the JSON payload.
+FAKE_METADATA = {
+    "id": "00000000-0000-0000-0000-000000000000",
+    "hostname": "scaleway.host",
+    "tags": [
+        "AUTHORIZED_KEY=ssh-rsa_AAAAB3NzaC1yc2EAAAADAQABDDDDD",
+    ],
+    "ssh_public_keys": [
+        {
+            "key": "ssh-rsa AAAAB3NzaC1yc2EAAAADAQABAAABA",
+            "fingerprint": "2048 06:ae:...  login (RSA)",
+        },
+        {
+            "key": "ssh-rsa AAAAB3NzaC1yc2EAAAADAQABCCCCC",
+            "fingerprint": "2048 06:ff:...  login2 (RSA)",
+        },
+    ],
+}
+
+# Expected get_public_ssh_keys() results, normalized once: key order is
+# not significant, so the tests compare sets.
+SSH_KEYS_FROM_TAGS = frozenset(
+    [
+        "ssh-rsa AAAAB3NzaC1yc2EAAAADAQABDDDDD",
+        "ssh-rsa AAAAB3NzaC1yc2EAAAADAQABCCCCC",
+    ]
+)
+SSH_KEYS_FROM_CONF = frozenset(
+    [
+        "ssh-rsa AAAAB3NzaC1yc2EAAAADAQABAAABA",
+        "ssh-rsa AAAAB3NzaC1yc2EAAAADAQABCCCCC",
+    ]
+)
+SSH_KEYS_ALL = frozenset(
+    [
+        "ssh-rsa AAAAB3NzaC1yc2EAAAADAQABAAABA",
+        "ssh-rsa AAAAB3NzaC1yc2EAAAADAQABCCCCC",
+        "ssh-rsa AAAAB3NzaC1yc2EAAAADAQABDDDDD",
+    ]
+)
+
+NETCFG_V4 = {
+    "version": 1,
+    "config": [
+        {
+            "type": "physical",
+            "name": "ens2",
+            "subnets": [{"type": "dhcp4"}],
+        }
+    ],
+}
+
+NETCFG_V4V6 = {
+    "version": 1,
+    "config": [
+        {
+            "type": "physical",
+            "name": "ens2",
+            "subnets": [
+                {"type": "dhcp4"},
+                {
+                    "type": "static",
+                    "address": "2000:abc:4444:9876::42:999",
+                    "netmask": "127",
+                    "routes": [
+                        {
+                            "gateway": "2000:abc:4444:9876::42:000",
+                            "network": "::",
+                            "prefix": "0",
+                        }
+                    ],
+                },
+            ],
+        }
+    ],
+}
 
 
 class MetadataResponses:
@@ -46,115 +112,80 @@ class MetadataResponses:
     Possible responses of the metadata API.
     """
 
-    FAKE_METADATA = {
-        "id": "00000000-0000-0000-0000-000000000000",
-        "hostname": "scaleway.host",
-        "tags": [
-            "AUTHORIZED_KEY=ssh-rsa_AAAAB3NzaC1yc2EAAAADAQABDDDDD",
-        ],
-        "ssh_public_keys": [
-            {
-                "key": "ssh-rsa AAAAB3NzaC1yc2EAAAADAQABAAABA",
-                "fingerprint": "2048 06:ae:...  login (RSA)",
-            },
-            {
-                "key": "ssh-rsa AAAAB3NzaC1yc2EAAAADAQABCCCCC",
-                "fingerprint": "2048 06:ff:...  login2 (RSA)",
-            },
-        ],
-    }
-
-    @classmethod
-    def get_ok(cls, response):
-        return 200, response.headers, json.dumps(cls.FAKE_METADATA)
+    # Serialized once at class-definition time: the payload is constant, so
+    # there is no point in re-encoding it on every mocked request.
+    FAKE_METADATA_JSON = json.dumps(FAKE_METADATA)
 
 
-class TestOnScaleway(CiTestCase):
-    def setUp(self):
-        super(TestOnScaleway, self).setUp()
-        self.tmp = self.tmp_dir()
+def install_mocks(fake_dmi, fake_file_exists, fake_cmdline):
+    mock, faked = fake_dmi
+    mock.return_value = "Scaleway" if faked else "Whatever"
 
-    def install_mocks(self, fake_dmi, fake_file_exists, fake_cmdline):
-        mock, faked = fake_dmi
-        mock.return_value = "Scaleway" if faked else "Whatever"
+    mock, faked = fake_file_exists
+    mock.return_value = faked
 
-        mock, faked = fake_file_exists
-        mock.return_value = faked
-
-        mock, faked = fake_cmdline
-        mock.return_value = (
-            "initrd=initrd showopts scaleway nousb"
-            if faked
-            else "BOOT_IMAGE=/vmlinuz-3.11.0-26-generic"
-        )
-
-    @mock.patch("cloudinit.util.get_cmdline")
-    @mock.patch("os.path.exists")
-    @mock.patch("cloudinit.dmi.read_dmi_data")
-    def test_not_ds_detect(
-        self, m_read_dmi_data, m_file_exists, m_get_cmdline
-    ):
-        self.install_mocks(
-            fake_dmi=(m_read_dmi_data, False),
-            fake_file_exists=(m_file_exists, False),
-            fake_cmdline=(m_get_cmdline, False),
-        )
-        self.assertFalse(DataSourceScaleway.DataSourceScaleway.ds_detect())
+    mock, faked = fake_cmdline
+    mock.return_value = (
+        "initrd=initrd showopts scaleway nousb"
+        if faked
+        else "BOOT_IMAGE=/vmlinuz-3.11.0-26-generic"
+    )
 
-        # When not on Scaleway, get_data() returns False.
-        datasource = DataSourceScaleway.DataSourceScaleway(
-            settings.CFG_BUILTIN, None, helpers.Paths({"run_dir": self.tmp})
-        )
-        self.assertFalse(datasource.get_data())
 
+class TestOnScaleway:
+    @pytest.mark.parametrize(
+        "fake_dmi,fake_file_exists,fake_cmdline,expected",
+        [
+            pytest.param(False, False, False, False, id="not_scaleway"),
+            pytest.param(True, False, False, True, id="dmi"),
+            pytest.param(False, True, False, True, id="var_run_scaleway"),
+            pytest.param(False, False, True, True, id="cmdline"),
+        ],
+    )
     @mock.patch("cloudinit.util.get_cmdline")
     @mock.patch("os.path.exists")
     @mock.patch("cloudinit.dmi.read_dmi_data")
-    def test_ds_detect_dmi(
-        self, m_read_dmi_data, m_file_exists, m_get_cmdline
+    def test_ds_detect(
+        self,
+        m_read_dmi_data,
+        m_file_exists,
+        m_get_cmdline,
+        fake_dmi,
+        fake_file_exists,
+        fake_cmdline,
+        expected,
     ):
         """
-        dmidecode returns "Scaleway".
+        ds_detect() returns True when dmidecode returns "Scaleway", when
+        /var/run/scaleway exists or when "scaleway" is in /proc/cmdline.
         """
-        # dmidecode returns "Scaleway"
-        self.install_mocks(
-            fake_dmi=(m_read_dmi_data, True),
-            fake_file_exists=(m_file_exists, False),
-            fake_cmdline=(m_get_cmdline, False),
+        install_mocks(
+            fake_dmi=(m_read_dmi_data, fake_dmi),
+            fake_file_exists=(m_file_exists, fake_file_exists),
+            fake_cmdline=(m_get_cmdline, fake_cmdline),
         )
-        self.assertTrue(DataSourceScaleway.DataSourceScaleway.ds_detect())
+        assert bool(DSScaleway.ds_detect()) is expected
 
     @mock.patch("cloudinit.util.get_cmdline")
     @mock.patch("os.path.exists")
     @mock.patch("cloudinit.dmi.read_dmi_data")
-    def test_ds_detect_var_run_scaleway(
-        self, m_read_dmi_data, m_file_exists, m_get_cmdline
+    def test_get_data_not_on_scaleway(
+        self, m_read_dmi_data, m_file_exists, m_get_cmdline, ds_deps
     ):
         """
-        /var/run/scaleway exists.
+        When not on Scaleway, get_data() returns False.
         """
-        self.install_mocks(
+        install_mocks(
             fake_dmi=(m_read_dmi_data, False),
-            fake_file_exists=(m_file_exists, True),
+            fake_file_exists=(m_file_exists, False),
             fake_cmdline=(m_get_cmdline, False),
         )
-        self.assertTrue(DataSourceScaleway.DataSourceScaleway.ds_detect())
 
-    @mock.patch("cloudinit.util.get_cmdline")
-    @mock.patch("os.path.exists")
-    @mock.patch("cloudinit.dmi.read_dmi_data")
-    def test_ds_detect_cmdline(
-        self, m_read_dmi_data, m_file_exists, m_get_cmdline
-    ):
-        """
-        "scaleway" in /proc/cmdline.
-        """
-        self.install_mocks(
-            fake_dmi=(m_read_dmi_data, False),
-            fake_file_exists=(m_file_exists, False),
-            fake_cmdline=(m_get_cmdline, True),
-        )
-        self.assertTrue(DataSourceScaleway.DataSourceScaleway.ds_detect())
+        # get_data() fails before ever touching the run_dir, so the shared
+        # module Paths can be reused instead of creating a per-test tmpdir.
+        _, paths = ds_deps
+        datasource = DSScaleway(settings.CFG_BUILTIN, None, paths)
+        assert not datasource.get_data()
 
 
 def get_source_address_adapter(*args, **kwargs):
@@ -171,138 +202,221 @@ def get_source_address_adapter(*args, **kwargs):
     return requests.adapters.HTTPAdapter(*args, **kwargs)
 
 
-def _fix_mocking_url(url: str) -> str:
-    # Workaround https://github.com/getsentry/responses/pull/166
-    # This function can be removed when Bionic is EOL
-    split_result = urlsplit(url)
-    return SplitResult(
-        scheme=split_result.scheme,
-        netloc=split_result.netloc,
-        path=split_result.path,
-        query="",  # ignore
-        fragment=split_result.fragment,
-    ).geturl()
-
-
-class TestDataSourceScaleway(ResponsesTestCase):
-    def setUp(self):
-        tmp = self.tmp_dir()
-        distro = mock.MagicMock()
-        distro.get_tmp_exec_path = self.tmp_dir
-        self.datasource = DataSourceScaleway.DataSourceScaleway(
-            settings.CFG_BUILTIN, distro, helpers.Paths({"run_dir": tmp})
-        )
-        super(TestDataSourceScaleway, self).setUp()
-
-        self.metadata_url = _fix_mocking_url(
-            DataSourceScaleway.BUILTIN_DS_CONFIG["metadata_url"]
-        )
-        self.userdata_url = DataSourceScaleway.BUILTIN_DS_CONFIG[
-            "userdata_url"
-        ]
-        self.vendordata_url = DataSourceScaleway.BUILTIN_DS_CONFIG[
-            "vendordata_url"
-        ]
-
-        self.add_patch(
-            "cloudinit.sources.DataSourceScaleway."
-            "DataSourceScaleway.ds_detect",
-            "_m_ds_detect",
-            return_value=True,
-        )
-        self.add_patch(
-            "cloudinit.sources.DataSourceScaleway.net.find_fallback_nic",
-            "_m_find_fallback_nic",
-            return_value="scalewaynic0",
-        )
+@pytest.fixture(autouse=True, scope="module")
+def network_sandbox():
+    """Keep every test in this module off privileged source ports.
 
-    @mock.patch("cloudinit.sources.DataSourceScaleway.EphemeralDHCPv4")
-    @mock.patch(
+    All HTTP traffic is served by responses, so the SourceAddressAdapter
+    patch is installed once per module instead of once per get_data() test.
+    """
+    with mock.patch(
         "cloudinit.sources.DataSourceScaleway.SourceAddressAdapter",
         get_source_address_adapter,
+    ):
+        yield
+
+
+# Workaround https://github.com/getsentry/responses/pull/166: the query
+# string must be stripped from the mocked metadata URL. Computed once at
+# import time; this can be removed when Bionic is EOL.
+_metadata_url_split = urlsplit(
+    DataSourceScaleway.BUILTIN_DS_CONFIG["metadata_url"]
+)
+METADATA_URL = SplitResult(
+    scheme=_metadata_url_split.scheme,
+    netloc=_metadata_url_split.netloc,
+    path=_metadata_url_split.path,
+    query="",  # ignore
+    fragment=_metadata_url_split.fragment,
+).geturl()
+
+
+@pytest.fixture(scope="module")
+def ds_deps(tmp_path_factory):
+    """Distro and Paths handed to every DataSourceScaleway under test.
+
+    Neither is mutated by the tests, so they are built once per module and
+    shared; only the datasource itself is recreated per test.
+    """
+    tmp = str(tmp_path_factory.mktemp("scaleway"))
+    # The tests only ever reach get_tmp_exec_path on the distro; a plain
+    # namespace is cheaper to build than a MagicMock and fails loudly if a
+    # code change starts relying on other distro attributes.
+    distro = SimpleNamespace(get_tmp_exec_path=lambda: tmp)
+    return distro, helpers.Paths({"run_dir": tmp})
+
+
+def with_network_mocks(test):
+    """Apply the patch stack shared by the network_config tests.
+
+    The mock is passed to the test as fallback_nic.
+    """
+    for patcher in (
+        mock.patch(
+            "cloudinit.sources.DataSourceScaleway.net.find_fallback_nic"
+        ),
+    ):
+        test = patcher(test)
+    return test
+
+
+class TestDataSourceScaleway:
+    @pytest.fixture(autouse=True)
+    def _scaleway_cmdline(self, mock_util_get_cmdline):
+        """Reuse the get_cmdline patch the sources conftest installs.
+
+        Every test here wants "scaleway" on the kernel command line;
+        adjusting the conftest mock's return value is free, while the old
+        per-test mock.patch decorators installed a second patcher each.
+        """
+        mock_util_get_cmdline.return_value = "scaleway"
+
+    @staticmethod
+    @pytest.fixture(autouse=True, scope="class")
+    def scaleway_mocks(request):
+        """Install the patchers shared by every test once per class."""
+        for target, kwargs in (
+            (
+                "cloudinit.sources.DataSourceScaleway."
+                "DataSourceScaleway.ds_detect",
+                {"return_value": True},
+            ),
+            (
+                "cloudinit.sources.DataSourceScaleway.net.find_fallback_nic",
+                {"return_value": "scalewaynic0"},
+            ),
+        ):
+            patcher = mock.patch(target, autospec=True, **kwargs)
+            patcher.start()
+            request.addfinalizer(patcher.stop)
+
+    @pytest.fixture
+    def datasource(self, ds_deps):
+        distro, paths = ds_deps
+        return DSScaleway(settings.CFG_BUILTIN, distro, paths)
+
+    # Built once and reused by every test: the mocked_responses fixture only
+    # starts, stops and resets it, instead of constructing a fresh
+    # RequestsMock per test.
+    _responses_pool = responses.RequestsMock(
+        assert_all_requests_are_fired=False
     )
-    @mock.patch("cloudinit.util.get_cmdline")
-    @mock.patch("time.sleep", return_value=None)
-    def test_metadata_ok(self, sleep, m_get_cmdline, dhcpv4):
+
+    @staticmethod
+    @pytest.fixture(scope="class")
+    def _zero_sleep():
+        """Replace the retry loop's clock once per class.
+
+        query_data_api() sleeps through the time module imported by
+        DataSourceScaleway, so patching it there is enough and avoids
+        re-installing a global time.sleep patch for every test.
+        """
+        with mock.patch(
+            "cloudinit.sources.DataSourceScaleway.time.sleep"
+        ) as m_sleep:
+            yield m_sleep
+
+    @pytest.fixture
+    def sleep(self, _zero_sleep):
+        _zero_sleep.reset_mock()
+        return _zero_sleep
+
+    @pytest.fixture
+    def mocked_responses(self):
+        self._responses_pool.start()
+        try:
+            yield self._responses_pool
+        finally:
+            self._responses_pool.stop()
+            self._responses_pool.reset()
+
+    @staticmethod
+    @pytest.fixture(scope="class")
+    def prebuilt_responses():
+        """Registrations shared by the metadata tests, built once per class.
+
+        Tests pick the registrations they need and add them to their own
+        RequestsMock; only the rate-limit sequence still has to be
+        registered per test.
+        """
+        return {
+            "metadata_ok": responses.Response(
+                responses.GET,
+                METADATA_URL,
+                body=MetadataResponses.FAKE_METADATA_JSON,
+            ),
+            "userdata_ok": responses.Response(
+                responses.GET, USERDATA_URL, body=DataResponses.FAKE_USER_DATA
+            ),
+            "userdata_empty": responses.Response(
+                responses.GET, USERDATA_URL, status=404
+            ),
+            "vendordata_ok": responses.Response(
+                responses.GET,
+                VENDORDATA_URL,
+                body=DataResponses.FAKE_USER_DATA,
+            ),
+            "vendordata_empty": responses.Response(
+                responses.GET, VENDORDATA_URL, status=404
+            ),
+        }
+
+    @mock.patch("cloudinit.sources.DataSourceScaleway.EphemeralDHCPv4")
+    def test_metadata_ok(
+        self,
+        dhcpv4,
+        datasource,
+        mocked_responses,
+        prebuilt_responses,
+        sleep,
+    ):
         """
         get_data() returns metadata, user data and vendor data.
         """
-        # fails on python 3.6
-        if sys.version_info.minor < 7:
-            return
-        m_get_cmdline.return_value = "scaleway"
-
         # Make user data API return a valid response
-        self.responses.add_callback(
-            responses.GET, self.metadata_url, callback=MetadataResponses.get_ok
-        )
-        self.responses.add_callback(
-            responses.GET, self.userdata_url, callback=DataResponses.get_ok
-        )
-        self.responses.add_callback(
-            responses.GET, self.vendordata_url, callback=DataResponses.get_ok
-        )
-        self.datasource.get_data()
-
-        self.assertEqual(
-            self.datasource.get_instance_id(),
-            MetadataResponses.FAKE_METADATA["id"],
-        )
-        self.assertEqual(
-            self.datasource.get_public_ssh_keys().sort(),
-            [
-                "ssh-rsa AAAAB3NzaC1yc2EAAAADAQABCCCCC",
-                "ssh-rsa AAAAB3NzaC1yc2EAAAADAQABDDDDD",
-                "ssh-rsa AAAAB3NzaC1yc2EAAAADAQABAAABA",
-            ].sort(),
-        )
-        self.assertEqual(
-            self.datasource.get_hostname().hostname,
-            MetadataResponses.FAKE_METADATA["hostname"],
-        )
-        self.assertEqual(
-            self.datasource.get_userdata_raw(), DataResponses.FAKE_USER_DATA
-        )
-        self.assertEqual(
-            self.datasource.get_vendordata_raw(), DataResponses.FAKE_USER_DATA
-        )
-        self.assertIsNone(self.datasource.availability_zone)
-        self.assertIsNone(self.datasource.region)
-        self.assertEqual(sleep.call_count, 0)
-
-    def test_ssh_keys_empty(self):
+        mocked_responses.add(prebuilt_responses["metadata_ok"])
+        mocked_responses.add(prebuilt_responses["userdata_ok"])
+        mocked_responses.add(prebuilt_responses["vendordata_ok"])
+        datasource.get_data()
+
+        assert datasource.get_instance_id() == FAKE_METADATA["id"]
+        assert frozenset(datasource.get_public_ssh_keys()) == SSH_KEYS_ALL
+        assert datasource.get_hostname().hostname == FAKE_METADATA["hostname"]
+        assert datasource.get_userdata_raw() == DataResponses.FAKE_USER_DATA
+        assert datasource.get_vendordata_raw() == DataResponses.FAKE_USER_DATA
+        assert datasource.availability_zone is None
+        assert datasource.region is None
+        assert sleep.call_count == 0
+
+    def test_ssh_keys_empty(self, datasource):
         """
         get_public_ssh_keys() should return empty list if no ssh key are
         available
         """
-        self.datasource.metadata["tags"] = []
-        self.datasource.metadata["ssh_public_keys"] = []
-        self.assertEqual(self.datasource.get_public_ssh_keys(), [])
+        datasource.metadata["tags"] = []
+        datasource.metadata["ssh_public_keys"] = []
+        assert datasource.get_public_ssh_keys() == []
 
-    def test_ssh_keys_only_tags(self):
+    def test_ssh_keys_only_tags(self, datasource):
         """
         get_public_ssh_keys() should return list of keys available in tags
         """
-        self.datasource.metadata["tags"] = [
+        datasource.metadata["tags"] = [
             "AUTHORIZED_KEY=ssh-rsa_AAAAB3NzaC1yc2EAAAADAQABDDDDD",
             "AUTHORIZED_KEY=ssh-rsa_AAAAB3NzaC1yc2EAAAADAQABCCCCC",
         ]
-        self.datasource.metadata["ssh_public_keys"] = []
-        self.assertEqual(
-            self.datasource.get_public_ssh_keys().sort(),
-            [
-                "ssh-rsa AAAAB3NzaC1yc2EAAAADAQABDDDDD",
-                "ssh-rsa AAAAB3NzaC1yc2EAAAADAQABCCCCC",
-            ].sort(),
+        datasource.metadata["ssh_public_keys"] = []
+        assert (
+            frozenset(datasource.get_public_ssh_keys()) == SSH_KEYS_FROM_TAGS
         )
 
-    def test_ssh_keys_only_conf(self):
+    def test_ssh_keys_only_conf(self, datasource):
         """
         get_public_ssh_keys() should return list of keys available in
         ssh_public_keys field
         """
-        self.datasource.metadata["tags"] = []
-        self.datasource.metadata["ssh_public_keys"] = [
+        datasource.metadata["tags"] = []
+        datasource.metadata["ssh_public_keys"] = [
             {
                 "key": "ssh-rsa AAAAB3NzaC1yc2EAAAADAQABAAABA",
                 "fingerprint": "2048 06:ae:...  login (RSA)",
@@ -312,25 +426,20 @@ class TestDataSourceScaleway(ResponsesTestCase):
                 "fingerprint": "2048 06:ff:...  login2 (RSA)",
             },
         ]
-        self.assertEqual(
-            self.datasource.get_public_ssh_keys().sort(),
-            [
-                "ssh-rsa AAAAB3NzaC1yc2EAAAADAQABCCCCC",
-                "ssh-rsa AAAAB3NzaC1yc2EAAAADAQABDDDDD",
-                "ssh-rsa AAAAB3NzaC1yc2EAAAADAQABAAABA",
-            ].sort(),
+        assert (
+            frozenset(datasource.get_public_ssh_keys()) == SSH_KEYS_FROM_CONF
         )
 
-    def test_ssh_keys_both(self):
+    def test_ssh_keys_both(self, datasource):
         """
         get_public_ssh_keys() should return a merge of keys available
         in ssh_public_keys and tags
         """
-        self.datasource.metadata["tags"] = [
+        datasource.metadata["tags"] = [
             "AUTHORIZED_KEY=ssh-rsa_AAAAB3NzaC1yc2EAAAADAQABDDDDD",
         ]
 
-        self.datasource.metadata["ssh_public_keys"] = [
+        datasource.metadata["ssh_public_keys"] = [
             {
                 "key": "ssh-rsa AAAAB3NzaC1yc2EAAAADAQABAAABA",
                 "fingerprint": "2048 06:ae:...  login (RSA)",
@@ -340,226 +449,117 @@ class TestDataSourceScaleway(ResponsesTestCase):
                 "fingerprint": "2048 06:ff:...  login2 (RSA)",
             },
         ]
-        self.assertEqual(
-            self.datasource.get_public_ssh_keys().sort(),
-            [
-                "ssh-rsa AAAAB3NzaC1yc2EAAAADAQABCCCCC",
-                "ssh-rsa AAAAB3NzaC1yc2EAAAADAQABDDDDD",
-                "ssh-rsa AAAAB3NzaC1yc2EAAAADAQABAAABA",
-            ].sort(),
-        )
+        assert frozenset(datasource.get_public_ssh_keys()) == SSH_KEYS_ALL
 
     @mock.patch("cloudinit.sources.DataSourceScaleway.EphemeralDHCPv4")
-    @mock.patch(
-        "cloudinit.sources.DataSourceScaleway.SourceAddressAdapter",
-        get_source_address_adapter,
-    )
-    @mock.patch("cloudinit.util.get_cmdline")
-    @mock.patch("time.sleep", return_value=None)
-    def test_metadata_404(self, sleep, m_get_cmdline, dhcpv4):
+    def test_metadata_404(
+        self,
+        dhcpv4,
+        datasource,
+        mocked_responses,
+        prebuilt_responses,
+        sleep,
+    ):
         """
         get_data() returns metadata, but no user data nor vendor data.
         """
-        # fails on python 3.6
-        if sys.version_info.minor < 7:
-            return
-        m_get_cmdline.return_value = "scaleway"
-
         # Make user and vendor data APIs return HTTP/404, which means there is
         # no user / vendor data for the server.
 
-        self.responses.add_callback(
-            responses.GET, self.metadata_url, callback=MetadataResponses.get_ok
-        )
-        self.responses.add_callback(
-            responses.GET, self.userdata_url, callback=DataResponses.empty
-        )
-        self.responses.add_callback(
-            responses.GET, self.vendordata_url, callback=DataResponses.empty
-        )
-        self.datasource.get_data()
-        self.assertIsNone(self.datasource.get_userdata_raw())
-        self.assertIsNone(self.datasource.get_vendordata_raw())
-        self.assertEqual(sleep.call_count, 0)
+        mocked_responses.add(prebuilt_responses["metadata_ok"])
+        mocked_responses.add(prebuilt_responses["userdata_empty"])
+        mocked_responses.add(prebuilt_responses["vendordata_empty"])
+        datasource.get_data()
+        assert datasource.get_userdata_raw() is None
+        assert datasource.get_vendordata_raw() is None
+        assert sleep.call_count == 0
 
     @mock.patch("cloudinit.sources.DataSourceScaleway.EphemeralDHCPv4")
-    @mock.patch(
-        "cloudinit.sources.DataSourceScaleway.SourceAddressAdapter",
-        get_source_address_adapter,
-    )
-    @mock.patch("cloudinit.util.get_cmdline")
-    @mock.patch("time.sleep", return_value=None)
-    def test_metadata_rate_limit(self, sleep, m_get_cmdline, dhcpv4):
+    def test_metadata_rate_limit(
+        self,
+        dhcpv4,
+        datasource,
+        mocked_responses,
+        prebuilt_responses,
+        sleep,
+    ):
         """
         get_data() is rate limited two times by the metadata API when fetching
         user data.
         """
-        if sys.version_info.minor < 7:
-            return
-
-        m_get_cmdline.return_value = "scaleway"
+        mocked_responses.add(prebuilt_responses["metadata_ok"])
+        mocked_responses.add(prebuilt_responses["vendordata_empty"])
 
-        self.responses.add_callback(
-            responses.GET, self.metadata_url, callback=MetadataResponses.get_ok
+        # responses consumes registrations for the same URL in order, so
+        # two HTTP/429 answers followed by a success need no stateful
+        # callback closure.
+        mocked_responses.add(responses.GET, USERDATA_URL, status=429)
+        mocked_responses.add(responses.GET, USERDATA_URL, status=429)
+        mocked_responses.add(
+            responses.GET, USERDATA_URL, body=DataResponses.FAKE_USER_DATA
         )
-        self.responses.add_callback(
-            responses.GET, self.vendordata_url, callback=DataResponses.empty
-        )
-
-        # Workaround https://github.com/getsentry/responses/pull/171
-        # This mocking can be unrolled when Bionic is EOL
-        call_count = 0
-
-        def _callback(request):
-            nonlocal call_count
-            call_count += 1
-            if call_count <= 2:
-                return DataResponses.rate_limited(request)
-            return DataResponses.get_ok(request)
-
-        self.responses.add_callback(
-            responses.GET, self.userdata_url, callback=_callback
-        )
-        self.datasource.get_data()
-        self.assertEqual(
-            self.datasource.get_userdata_raw(), DataResponses.FAKE_USER_DATA
-        )
-        self.assertEqual(sleep.call_count, 2)
-
-    @mock.patch("cloudinit.sources.DataSourceScaleway.net.find_fallback_nic")
-    @mock.patch("cloudinit.util.get_cmdline")
-    def test_network_config_ok(self, m_get_cmdline, fallback_nic):
-        """
-        network_config will only generate IPv4 config if no ipv6 data is
-        available in the metadata
-        """
-        m_get_cmdline.return_value = "scaleway"
-        fallback_nic.return_value = "ens2"
-        self.datasource.metadata["ipv6"] = None
-
-        netcfg = self.datasource.network_config
-        resp = {
-            "version": 1,
-            "config": [
+        datasource.get_data()
+        assert datasource.get_userdata_raw() == DataResponses.FAKE_USER_DATA
+        assert sleep.call_count == 2
+
+    @pytest.mark.parametrize(
+        "ipv6,cached_netcfg,expect_warning,expected",
+        [
+            pytest.param(
+                None, sources.UNSET, False, NETCFG_V4, id="ipv4_only"
+            ),
+            pytest.param(
                 {
-                    "type": "physical",
-                    "name": "ens2",
-                    "subnets": [{"type": "dhcp4"}],
-                }
-            ],
-        }
-        self.assertEqual(netcfg, resp)
-
-    @mock.patch("cloudinit.sources.DataSourceScaleway.net.find_fallback_nic")
-    @mock.patch("cloudinit.util.get_cmdline")
-    def test_network_config_ipv6_ok(self, m_get_cmdline, fallback_nic):
+                    "address": "2000:abc:4444:9876::42:999",
+                    "gateway": "2000:abc:4444:9876::42:000",
+                    "netmask": "127",
+                },
+                sources.UNSET,
+                False,
+                NETCFG_V4V6,
+                id="ipv6",
+            ),
+            pytest.param(None, None, True, NETCFG_V4, id="cached_none"),
+        ],
+    )
+    @mock.patch("cloudinit.sources.DataSourceScaleway.LOG.warning")
+    @with_network_mocks
+    def test_network_config(
+        self,
+        fallback_nic,
+        logwarning,
+        ipv6,
+        cached_netcfg,
+        expect_warning,
+        expected,
+        datasource,
+    ):
         """
-        network_config will only generate IPv4/v6 configs if ipv6 data is
-        available in the metadata
+        network_config only generates an IPv6 subnet when ipv6 metadata is
+        present, regenerates the config when the cache is sources.UNSET
+        (which it is after the first boot) and warns when the cached value
+        is None.
         """
-        m_get_cmdline.return_value = "scaleway"
         fallback_nic.return_value = "ens2"
-        self.datasource.metadata["ipv6"] = {
-            "address": "2000:abc:4444:9876::42:999",
-            "gateway": "2000:abc:4444:9876::42:000",
-            "netmask": "127",
-        }
+        datasource.metadata["ipv6"] = ipv6
+        datasource._network_config = cached_netcfg
 
-        netcfg = self.datasource.network_config
-        resp = {
-            "version": 1,
-            "config": [
-                {
-                    "type": "physical",
-                    "name": "ens2",
-                    "subnets": [
-                        {"type": "dhcp4"},
-                        {
-                            "type": "static",
-                            "address": "2000:abc:4444:9876::42:999",
-                            "netmask": "127",
-                            "routes": [
-                                {
-                                    "gateway": "2000:abc:4444:9876::42:000",
-                                    "network": "::",
-                                    "prefix": "0",
-                                }
-                            ],
-                        },
-                    ],
-                }
-            ],
-        }
-        self.assertEqual(netcfg, resp)
+        assert datasource.network_config == expected
+        if expect_warning:
+            logwarning.assert_called_with(
+                "Found None as cached _network_config. Resetting to %s",
+                sources.UNSET,
+            )
+        else:
+            logwarning.assert_not_called()
 
-    @mock.patch("cloudinit.sources.DataSourceScaleway.net.find_fallback_nic")
-    @mock.patch("cloudinit.util.get_cmdline")
-    def test_network_config_existing(self, m_get_cmdline, fallback_nic):
+    @with_network_mocks
+    def test_network_config_existing(self, fallback_nic, datasource):
         """
         network_config() should return the same data if a network config
         already exists
         """
-        m_get_cmdline.return_value = "scaleway"
-        self.datasource._network_config = "0xdeadbeef"
-
-        netcfg = self.datasource.network_config
-        self.assertEqual(netcfg, "0xdeadbeef")
-
-    @mock.patch("cloudinit.sources.DataSourceScaleway.net.find_fallback_nic")
-    @mock.patch("cloudinit.util.get_cmdline")
-    def test_network_config_unset(self, m_get_cmdline, fallback_nic):
-        """
-        _network_config will be set to sources.UNSET after the first boot.
-        Make sure it behave correctly.
-        """
-        m_get_cmdline.return_value = "scaleway"
-        fallback_nic.return_value = "ens2"
-        self.datasource.metadata["ipv6"] = None
-        self.datasource._network_config = sources.UNSET
-
-        resp = {
-            "version": 1,
-            "config": [
-                {
-                    "type": "physical",
-                    "name": "ens2",
-                    "subnets": [{"type": "dhcp4"}],
-                }
-            ],
-        }
-
-        netcfg = self.datasource.network_config
-        self.assertEqual(netcfg, resp)
-
-    @mock.patch("cloudinit.sources.DataSourceScaleway.LOG.warning")
-    @mock.patch("cloudinit.sources.DataSourceScaleway.net.find_fallback_nic")
-    @mock.patch("cloudinit.util.get_cmdline")
-    def test_network_config_cached_none(
-        self, m_get_cmdline, fallback_nic, logwarning
-    ):
-        """
-        network_config() should return config data if cached data is None
-        rather than sources.UNSET
-        """
-        m_get_cmdline.return_value = "scaleway"
-        fallback_nic.return_value = "ens2"
-        self.datasource.metadata["ipv6"] = None
-        self.datasource._network_config = None
+        datasource._network_config = "0xdeadbeef"
 
-        resp = {
-            "version": 1,
-            "config": [
-                {
-                    "type": "physical",
-                    "name": "ens2",
-                    "subnets": [{"type": "dhcp4"}],
-                }
-            ],
-        }
-
-        netcfg = self.datasource.network_config
-        self.assertEqual(netcfg, resp)
-        logwarning.assert_called_with(
-            "Found None as cached _network_config. Resetting to %s",
-            sources.UNSET,
-        )
+        netcfg = datasource.network_config
+        assert netcfg == "0xdeadbeef"